@@ -1,4 +1,187 @@
+import numpy as np
 import torch
+import torch.nn.functional as F
+
+# numba is optional: CPU runs get a parallel stencil fast path if it is installed
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# triton is optional: CUDA runs get a handwritten stencil kernel if it is installed
+try:
+    import triton
+    import triton.language as tl
+    _HAS_TRITON = True
+except ImportError:
+    _HAS_TRITON = False
+
+def pack_bits_z(grid):
+    """ Pack a 0/1 grid along the z-axis into int32 words (32 cells per word)
+    Reduces memory and transfer volume of a stored grid by factor 8 compared to uint8.
+
+    Arguments:
+        grid {tensor} -- 0/1 grid of shape (width, depth, height), dtype uint8
+
+    Returns:
+        [tensor] -- Packed grid of shape (width, depth, ceil(height/32)), dtype int32
+    """
+    width, depth, height = grid.shape
+    n_words = (height + 31) // 32
+    if height % 32 != 0:
+        grid = F.pad(grid, (0, n_words*32 - height))
+    bit_weights = torch.arange(32, device=grid.device, dtype=torch.int32)
+    # each cell sets one distinct bit, so the sum equals the bitwise OR;
+    # keep the accumulation in int32 (integer sums promote to int64 by
+    # default) -- wraparound of the sign bit leaves the bit pattern intact
+    return (grid.view(width, depth, n_words, 32).to(torch.int32) << bit_weights).sum(dim=-1, dtype=torch.int32)
+
+def unpack_bits_z(packed, height):
+    """ Unpack an int32 grid created by pack_bits_z back to a 0/1 uint8 grid
+
+    Arguments:
+        packed {tensor} -- Packed grid of shape (width, depth, ceil(height/32)), dtype int32
+        height {int} -- Original grid size in z-direction
+
+    Returns:
+        [tensor] -- 0/1 grid of shape (width, depth, height), dtype uint8
+    """
+    width, depth = packed.shape[0], packed.shape[1]
+    bit_weights = torch.arange(32, device=packed.device, dtype=torch.int32)
+    bits = (packed.unsqueeze(-1) >> bit_weights) & 1
+    return bits.view(width, depth, -1)[:, :, :height].to(torch.uint8)
+
+# neighbor offsets (shift, dim) of the activation-factor stencil,
+# innermost (z) axis first -- those shifts move contiguous memory
+_NEIGHBOR_SHIFTS = ((2, 2), (1, 2), (-1, 2), (-2, 2),
+                    (2, 1), (1, 1), (-1, 1),
+                    (2, 0), (1, 0), (-1, 0), (-2, 0))
+
+def _step(hum, act, cld, f_act, P_hum, P_act, sel_act, P_ext, sel_ext):
+    """ One CA step: growth rules followed by formation/extinction rules
+    Free function over plain tensors, so torch.compile can fuse the whole
+    elementwise chain into few kernels instead of ~25 separate launches.
+    All grids are updated in place; the new activation grid is built in
+    the f_act buffer, so caller and callee swap the act/f_act buffers
+    each step instead of allocating new ones.
+
+    Arguments:
+        hum {tensor} -- humidity/vapor grid (uint8)
+        act {tensor} -- activation grid (uint8)
+        cld {tensor} -- cloud grid (uint8)
+        f_act {tensor} -- scratch buffer for the activation factor (uint8)
+        P_hum {float} -- formation probability for hum (0...1), whole volume
+        P_act {float} -- formation probability for act (0...1) inside sel_act
+        sel_act {tensor} -- 0/1 region mask for act formation (bool)
+        P_ext {float} -- extinction probability for cld (0...1) inside sel_ext
+        sel_ext {tensor} -- 0/1 region mask for cld extinction (bool)
+
+    Returns:
+        (tensor, tensor, tensor, tensor) -- updated (hum, act, cld, f_act),
+                                            with act and f_act buffers swapped
+    """
+    # growth rules
+    # activation factor: neighbor count over the offset table (circular
+    # shifts via torch.roll, which stays fusable unlike torch.cat),
+    # summed into the preallocated buffer and clamped to 0/1 presence;
+    # the additive reduction lets backends tree-reduce instead of
+    # serializing a chain of dependent ORs
+    f_act.zero_()
+    for shift, dim in _NEIGHBOR_SHIFTS:
+        f_act += torch.roll(act, shift, dim)
+    f_act.clamp_(max=1)
+    cld |= act
+    f_act &= ~act # new act = ~act & hum & f_act ...
+    f_act &= hum  # ... built in the f_act buffer, before hum is touched
+    hum &= ~act   # new hum, without the hum_temp round-trip
+    # formation and extinction rules (act now lives in the f_act buffer);
+    # the probabilities are scalars, so no P grids have to be read
+    hum |= (torch.rand(hum.shape, device=hum.device) < P_hum)
+    f_act |= (torch.rand(act.shape, device=act.device) < P_act) & sel_act
+    cld &= ~((torch.rand(cld.shape, device=cld.device) < P_ext) & sel_ext)
+
+    return hum, f_act, cld, act
+
+if hasattr(torch, 'compile'):
+    # dynamic=False: the grid shape is fixed for the lifetime of a
+    # simulation, so let Inductor bake the extents into the generated
+    # kernels instead of guarding on symbolic shapes
+    _step = torch.compile(_step, mode='reduce-overhead', fullgraph=True,
+                          dynamic=False)
+
+if _HAS_TRITON:
+    @triton.jit
+    def _growth_kernel(hum_ptr, act_ptr, cld_ptr, f_act_ptr,
+                       width, depth, height, BLOCK: tl.constexpr):
+        """ Growth rules for one z-line of the grid in a single fused pass
+        Each program handles one (x, y) column: it reads the eleven
+        circular neighbor lines of act once, ORs them into the activation
+        factor and writes the new act (into the f_act buffer), hum and cld
+        without any intermediate grids.
+        """
+        pid = tl.program_id(0)
+        i = pid // depth
+        j = pid % depth
+        k = tl.arange(0, BLOCK)
+        mask = k < height
+        base = (i * depth + j) * height
+        # circular neighbor OR (x: +-1/+-2, y: -1/+1/+2, z: +-1/+-2)
+        f = tl.load(act_ptr + ((i + width - 2) % width * depth + j) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + ((i + width - 1) % width * depth + j) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + ((i + 1) % width * depth + j) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + ((i + 2) % width * depth + j) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + (i * depth + (j + depth - 2) % depth) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + (i * depth + (j + depth - 1) % depth) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + (i * depth + (j + 1) % depth) * height + k, mask=mask, other=0)
+        f |= tl.load(act_ptr + base + (k + height - 2) % height, mask=mask, other=0)
+        f |= tl.load(act_ptr + base + (k + height - 1) % height, mask=mask, other=0)
+        f |= tl.load(act_ptr + base + (k + 1) % height, mask=mask, other=0)
+        f |= tl.load(act_ptr + base + (k + 2) % height, mask=mask, other=0)
+        a = tl.load(act_ptr + base + k, mask=mask, other=0)
+        h = tl.load(hum_ptr + base + k, mask=mask, other=0)
+        c = tl.load(cld_ptr + base + k, mask=mask, other=0)
+        tl.store(f_act_ptr + base + k, (a ^ 1) & h & f, mask=mask)
+        tl.store(hum_ptr + base + k, h & (a ^ 1), mask=mask)
+        tl.store(cld_ptr + base + k, c | a, mask=mask)
+
+if _HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _step_numba(hum, act, cld, f_act, P_hum, P_act, sel_act, P_ext, sel_ext,
+                    rnd_hum, rnd_act, rnd_ext):
+        """ One CA step as a parallel stencil over numpy grids
+        Same rules as _step, but one fused pass per cell: neighbor OR,
+        growth update and formation/extinction without any temporaries.
+        The new activation grid is written to f_act; the caller swaps
+        the act/f_act buffers afterwards. The uniform draws come in as
+        pre-generated arrays, keeping NumPy RNG calls out of the jitted
+        code so runs stay reproducible under parallel=True.
+        """
+        width, depth, height = hum.shape
+        for i in prange(width):
+            for j in range(depth):
+                for k in range(height):
+                    # circular neighbor OR (x: +-1/+-2, y: -1/+1/+2, z: +-1/+-2)
+                    f = (act[(i-2) % width, j, k] | act[(i-1) % width, j, k] |
+                         act[(i+1) % width, j, k] | act[(i+2) % width, j, k] |
+                         act[i, (j-2) % depth, k] | act[i, (j-1) % depth, k] |
+                         act[i, (j+1) % depth, k] |
+                         act[i, j, (k-2) % height] | act[i, j, (k-1) % height] |
+                         act[i, j, (k+1) % height] | act[i, j, (k+2) % height])
+                    a = act[i, j, k]
+                    new_hum = hum[i, j, k] & (a ^ 1)
+                    new_act = (a ^ 1) & hum[i, j, k] & f
+                    new_cld = cld[i, j, k] | a
+                    # formation and extinction
+                    if rnd_hum[i, j, k] < P_hum:
+                        new_hum = 1
+                    if sel_act[i, j, k] and rnd_act[i, j, k] < P_act:
+                        new_act = 1
+                    if sel_ext[i, j, k] and rnd_ext[i, j, k] < P_ext:
+                        new_cld = 0
+                    hum[i, j, k] = new_hum
+                    f_act[i, j, k] = new_act
+                    cld[i, j, k] = new_cld
 
 class CAclouds3D():
     """ Cloud simulation by Cellular Automaton for creating nice clouds.
@@ -7,7 +190,7 @@ class CAclouds3D():
     Chaos 24, 013125 (2014); https://doi.org/10.1063/1.4866854
     W. Christopher Immanuel and S. Paul Mary Deborrah and R. Samuel Selvaraj
     """
-    def __init__(self, width, depth, height, device='cpu', *args, **kwargs):
+    def __init__(self, width, depth, height, device='cpu', seed=None, *args, **kwargs):
         """ Initialsation
 
         Arguments:
@@ -17,6 +200,7 @@ class CAclouds3D():
 
         Keyword Arguments:
             device {str} -- Device on which the calculation is done ('cpu', 'cuda', 'cuda:0', ...) (default: {'cpu'})
+            seed {int} -- Seed for the random number generators, for reproducible runs (default: {None})
 
         Returns:
             CAcloud3D -- Object for 3D cloud creation/simulation
@@ -25,27 +209,38 @@ class CAclouds3D():
         self.depth = depth
         self.height = height
         self.dev = torch.device(device)
-        # one-time init for all coordinate combinations
-        self.x, self.y, self.z = torch.meshgrid(torch.arange(0, self.width, device=self.dev),
-                                                torch.arange(0, self.depth, device=self.dev),
-                                                torch.arange(0, self.height, device=self.dev)
-                                               )
+        if seed is not None:
+            # seed the device-local default generator: its philox state is
+            # what CUDA graph capture records and replays, so seeding it
+            # directly keeps step() capturable (an explicit torch.Generator
+            # threaded through the compiled step would not be)
+            if self.dev.type == 'cuda':
+                torch.cuda.manual_seed_all(seed)
+            else:
+                torch.manual_seed(seed)
+        # generator for the numba stencil path: its uniforms are drawn in
+        # interpreted code and passed into the jitted kernel, so the same
+        # seed reproduces CPU runs through the stencil as well (seeding
+        # numba's internal per-thread generators from outside jitted code
+        # is not possible)
+        self.rng = np.random.default_rng(seed)
 
         # init CA grids
+        # all grids are C-contiguous (width, depth, height), i.e. the
+        # z-axis is the innermost/unit-stride dimension -- the axis with
+        # the most neighbor shifts, so those run on contiguous memory
         self.hum = torch.zeros((width, depth, height), device=self.dev, dtype=torch.uint8) # humidity/vapor
         self.act = torch.zeros((width, depth, height), device=self.dev, dtype=torch.uint8) # activation/phase transition factor
         self.cld = torch.zeros((width, depth, height), device=self.dev, dtype=torch.uint8) # clouds
         self.f_act = torch.zeros_like(self.act) # activation factor -> helper variable for calculation
-        self.hum_temp = torch.zeros_like(self.hum) # temporary tensor for humidity, since it is also used for act calculation
-        # Variables for formation and extinction process
-        # reserve memory for random number creation
-        self.rnd_hum = torch.zeros_like(self.hum, dtype=torch.int16)
-        self.rnd_act = torch.zeros_like(self.act, dtype=torch.int16)
-        self.rnd_ext = torch.zeros_like(self.cld, dtype=torch.int16)
-        # probability areas for random variable changes
-        self.P_hum = torch.zeros_like(self.hum, dtype=torch.int16)
-        self.P_act = torch.zeros_like(self.act, dtype=torch.int16)
-        self.P_ext = torch.zeros_like(self.cld, dtype=torch.int16)
+        # probabilities for random variable changes: the elliptic setup only
+        # ever produces two-valued grids, so store scalar probabilities
+        # (0...1) plus 0/1 region masks instead of full float grids
+        self.P_hum = 0.
+        self.P_act = 0.
+        self.P_ext = 0.
+        self.sel_act = torch.zeros_like(self.act, dtype=torch.bool)
+        self.sel_ext = torch.zeros_like(self.cld, dtype=torch.bool)
 
         return super().__init__(*args, **kwargs)
 
@@ -134,56 +329,79 @@ class CAclouds3D():
             P_ext0 = 10000
 
         # create selection masks
-        distance = (self.x-c_x)**2/f_x + (self.y-c_y)**2/f_y + (self.z-c_z)**2/f_z
+        # per-axis squared distances are 1D float32 vectors that broadcast
+        # to the full grid in one fused expression -- no int64 meshgrids
+        dist_x = (torch.arange(self.width, device=self.dev, dtype=torch.float32) - c_x)**2 / f_x
+        dist_y = (torch.arange(self.depth, device=self.dev, dtype=torch.float32) - c_y)**2 / f_y
+        dist_z = (torch.arange(self.height, device=self.dev, dtype=torch.float32) - c_z)**2 / f_z
+        distance = dist_x.view(-1, 1, 1) + dist_y.view(1, -1, 1) + dist_z.view(1, 1, -1)
         # inner
         sel_inner = distance <= radius + overlap
         # outer
         sel_outer = distance > radius - overlap
 
-        self.P_hum = P_hum0 # humidity for complete volume
-        self.P_act[sel_inner] = P_act0
-        self.P_ext[sel_outer] = P_ext0
+        # probabilities are stored as scalar 0...1 fractions with region masks
+        self.P_hum = P_hum0 / 10000. # humidity for complete volume
+        self.P_act = P_act0 / 10000.
+        self.P_ext = P_ext0 / 10000.
+        self.sel_act = sel_inner
+        self.sel_ext = sel_outer
 
-    def __cloud_growth__(self):
-        """ Application of CA rules to hum, act, cld grids
+    def __step_numba__(self):
+        """ CPU fast path: run one step as the Numba-parallel stencil on the
+        numpy views of the grids (shared memory, no copies)
         """
-        # calculate new hum
-        self.hum_temp = self.hum & ~self.act
-        # calculate new cld
-        self.cld = self.cld | self.act
-        # calculate new activation factor
-        self.f_act = (
-                torch.cat((self.act[-2:,:,:], self.act[:-2,:,:]), dim=0) | torch.cat((self.act[-1:,:,:], self.act[:-1,:,:]), dim=0) |
-                torch.cat((self.act[1:,:,:], self.act[:1,:,:]), dim=0) | torch.cat((self.act[2:,:,:], self.act[:2,:,:]), dim=0) |
-                torch.cat((self.act[:,-2:,:], self.act[:,:-2,:]), dim=1) | torch.cat((self.act[:,-1:,:], self.act[:,:-1,:]), dim=1) |
-                torch.cat((self.act[:,1:,:], self.act[:,:1,:]), dim=1) |
-                torch.cat((self.act[:,:,-2:], self.act[:,:,:-2]), dim=2) | torch.cat((self.act[:,:,-1:], self.act[:,:,:-1]), dim=2) |
-                torch.cat((self.act[:,:,1:], self.act[:,:,:1]), dim=2) | torch.cat((self.act[:,:,2:], self.act[:,:,:2]), dim=2)
-                )
-        # calculate new act
-        self.act = ~self.act & self.hum & self.f_act
-        self.act2 = self.act
-        # copy hum_temp to hum
-        self.hum = self.hum_temp
-
-    def __cloud_FormationExtinction__(self):
-        """ Apllication of formation and extinction rules
+        shape = (self.width, self.depth, self.height)
+        rnd_hum = self.rng.random(shape, dtype=np.float32)
+        rnd_act = self.rng.random(shape, dtype=np.float32)
+        rnd_ext = self.rng.random(shape, dtype=np.float32)
+        _step_numba(self.hum.numpy(), self.act.numpy(), self.cld.numpy(),
+                    self.f_act.numpy(), self.P_hum,
+                    self.P_act, self.sel_act.numpy(),
+                    self.P_ext, self.sel_ext.numpy(),
+                    rnd_hum, rnd_act, rnd_ext)
+        self.act, self.f_act = self.f_act, self.act
+
+    def __step_triton__(self):
+        """ CUDA fast path: run the growth rules as the handwritten Triton
+        stencil (one fused pass, act read once per neighbor line), then the
+        formation/extinction rules in torch
+        """
+        _growth_kernel[(self.width * self.depth,)](
+                self.hum, self.act, self.cld, self.f_act,
+                self.width, self.depth, self.height,
+                BLOCK=triton.next_power_of_2(self.height))
+        self.act, self.f_act = self.f_act, self.act
+        self.__formation_extinction__()
+
+    def __formation_extinction__(self):
+        """ Application of the formation and extinction rules only
         """
-        # update random values
-        self.rnd_hum.random_(0, 10001)
-        self.rnd_act.random_(0, 10001)
-        self.rnd_ext.random_(0, 10001)
-        # update cell states
-        self.hum = self.hum | (self.rnd_hum < self.P_hum)
-        self.act = self.act | (self.rnd_act < self.P_act)
-        self.cld = self.cld & (self.rnd_ext > self.P_ext)
+        self.hum |= (torch.rand(self.hum.shape, device=self.dev) < self.P_hum)
+        self.act |= (torch.rand(self.act.shape, device=self.dev) < self.P_act) & self.sel_act
+        self.cld &= ~((torch.rand(self.cld.shape, device=self.dev) < self.P_ext) & self.sel_ext)
 
     def step(self):
         """ Execute one simulation step (for external simulation loops)
         (application of growth and formation/extinction rules)
         """
-        self.__cloud_growth__()
-        self.__cloud_FormationExtinction__()
+        if not bool(self.act.any()):
+            # empty activation grid (e.g. the first steps after init):
+            # the growth rules cannot change any cell, so skip them and
+            # apply only formation/extinction
+            self.__formation_extinction__()
+            return
+        if _HAS_NUMBA and self.dev.type == 'cpu':
+            self.__step_numba__()
+            return
+        if _HAS_TRITON and self.dev.type == 'cuda':
+            self.__step_triton__()
+            return
+        self.hum, self.act, self.cld, self.f_act = _step(self.hum, self.act,
+                                                         self.cld, self.f_act,
+                                                         self.P_hum,
+                                                         self.P_act, self.sel_act,
+                                                         self.P_ext, self.sel_ext)
 
     def simulate(self, n_iterations):
         """ Execute simulation steps
@@ -192,9 +410,35 @@ class CAclouds3D():
         Arguments:
             n_iterations {int} -- Number of steps to be executed
         """
+        # dispatch once instead of per step; the torch loop below enqueues
+        # all iterations without a host synchronization in between, so the
+        # compiled step replays as captured CUDA graphs back to back
+        if _HAS_NUMBA and self.dev.type == 'cpu':
+            for i in range(n_iterations):
+                self.__step_numba__()
+            return
+        if _HAS_TRITON and self.dev.type == 'cuda':
+            for i in range(n_iterations):
+                self.__step_triton__()
+            return
+        hum, act, cld, f_act = self.hum, self.act, self.cld, self.f_act
         for i in range(n_iterations):
-            self.__cloud_growth__()
-            self.__cloud_FormationExtinction__()
+            hum, act, cld, f_act = _step(hum, act, cld, f_act,
+                                         self.P_hum,
+                                         self.P_act, self.sel_act,
+                                         self.P_ext, self.sel_ext)
+        self.hum, self.act, self.cld, self.f_act = hum, act, cld, f_act
+
+    def get_cld_packed(self):
+        """ Get the cloud grid bit-packed along the z-axis
+        Useful for compact storage or device-to-host transfer of the grid
+        (8x fewer bytes than the uint8 representation);
+        restore with unpack_bits_z(packed, height).
+
+        Returns:
+            [tensor] -- Packed cld grid of shape (width, depth, ceil(height/32)), dtype int32
+        """
+        return pack_bits_z(self.cld)
 
     def get_cloud_positions(self):
         """Calculate a 2D Vector of x/y/z-Positions for all Cells with cld state equal to 1.
@@ -202,11 +446,6 @@ class CAclouds3D():
         Returns:
             [tensor] -- [[x0, y0, z0], [x1, y1, z1], ...] Positions of cld=1 cells
         """
-        # create selection mask
-        selection = self.cld.reshape(1, -1).squeeze() == 1
-        # flatten coordinate arrays
-        x = self.x.reshape(1, -1).squeeze()[selection]
-        y = self.y.reshape(1, -1).squeeze()[selection]
-        z = self.z.reshape(1, -1).squeeze()[selection]
-
-        return torch.cat((x, y, z), -1).view(3, -1).transpose(0,1)
\ No newline at end of file
+        # torch.nonzero returns the (x, y, z) index triples directly,
+        # without masking three flattened coordinate grids
+        return torch.nonzero(self.cld)
\ No newline at end of file
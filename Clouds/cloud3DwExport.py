@@ -1,5 +1,5 @@
-from CAclouds import CAclouds3D
-import numpy as np
+from CAclouds import CAclouds3D, pack_bits_z, unpack_bits_z
+import torch
 import vispy.scene
 from vispy.scene import visuals
 from vispy.util import keys
@@ -39,11 +39,22 @@ if __name__ == '__main__':
     import sys
     if sys.flags.interactive != 1:
         vispy.app.run()
-        xyz = cloud.cld.cpu().numpy()
-        coordinates_xyz = np.argwhere(xyz)
-        x_min, y_min, z_min = coordinates_xyz.min(axis=0)
-        x_max, y_max, z_max = coordinates_xyz.max(axis=0)
-        xyz = xyz[x_min:x_max+1, y_min:y_max+1, z_min:z_max+1]
+        # bounding box and crop on the device, so only the occupied region
+        # leaves the GPU
+        coordinates_xyz = torch.nonzero(cloud.cld)
+        x_min, y_min, z_min = torch.min(coordinates_xyz, dim=0)[0].tolist()
+        x_max, y_max, z_max = torch.max(coordinates_xyz, dim=0)[0].tolist()
+        cropped = cloud.cld[x_min:x_max+1, y_min:y_max+1, z_min:z_max+1].contiguous()
+        # stream the crop to the host bit-packed through a pinned staging
+        # buffer: 8x less transfer volume and an asynchronous DMA copy
+        # instead of a blocking .cpu() of the full uint8 grid
+        packed = pack_bits_z(cropped)
+        if packed.is_cuda:
+            staging = torch.empty(packed.shape, dtype=packed.dtype).pin_memory()
+            staging.copy_(packed, non_blocking=True)
+            torch.cuda.synchronize()
+            packed = staging
+        xyz = unpack_bits_z(packed, cropped.shape[2]).numpy()
 
         vox = Vox.from_dense(xyz)
 